@@ -9,6 +9,7 @@ from textual.app import App, ComposeResult
 from textual.containers import Horizontal, Vertical
 from textual.widgets import Button, Footer, Header, Input, RichLog, Select, Static
 
+from profiling import install_profiling
 from services.auth_service import NetEaseAuthService
 from view_state import (
     build_summary_text,
@@ -42,6 +43,7 @@ class NetEaseCookieTUI(App):
         super().__init__()
         self.auth = NetEaseAuthService()
         self.workflow = AuthWorkflow(self.auth)
+        self.profiling = install_profiling(self.workflow, self.auth.storage)
         self.pending_ticket = ''
         self.pending_phone = ''
         self.pending_verify_url = ''
@@ -89,9 +91,17 @@ class NetEaseCookieTUI(App):
         self.refresh_action_visibility()
         self.refresh_button_labels()
         self.write_log('转换器已启动。', restored)
+        if self.profiling.get('status') == 'success':
+            self.write_log(self.profiling['message'])
+        if self.auth.cassette.get('mode'):
+            self.write_log(self.auth.cassette['message'])
         if restored.get('status') == 'success':
             self.write_log('检测到本地已有可复用会话，可直接导出或校验。', restored)
 
+    def on_unmount(self):
+        self.workflow.stop_verify_polling()
+        self.auth.close()
+
     def action_refresh_summary(self):
         self.refresh_summary()
         self.refresh_action_visibility()
@@ -9,6 +9,18 @@ class NetEaseEmailAuth(NetEaseAuthService):
 
 
 if __name__ == '__main__':
+    import argparse
     import json
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bundle', choices=['json', 'zip'], help='将当前会话导出为单个认证产物包')
+    parser.add_argument('--label', default='restored_session')
+    parser.add_argument('--stdout', action='store_true', help='把认证产物包写到标准输出而不是 artifacts 目录')
+    args = parser.parse_args()
     auth = NetEaseEmailAuth()
+    if args.bundle:
+        result = auth.export_bundle(args.label, args.bundle, sys.stdout if args.stdout else None)
+        if not args.stdout or result['status'] != 'success':
+            print(json.dumps(result, ensure_ascii=False, indent=2), file=sys.stderr if args.stdout else sys.stdout)
+        sys.exit(0 if result['status'] == 'success' else 1)
     print(json.dumps(auth.get_state_snapshot(), ensure_ascii=False, indent=2))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+
+PROFILE_ENV = 'NETEASE_PROFILE'
+PROFILE_DIR = 'profiles'
+TOP_LIMIT = 25
+
+WORKFLOW_PHASES = (
+    'restore_previous_session',
+    'run_email_login',
+    'request_phone_sms',
+    'complete_phone_login',
+    'confirm_verification',
+    'fetch_mailbox',
+    'export_artifacts',
+    'start_verify_polling',
+    'stop_verify_polling',
+)
+
+STORAGE_SAVE_PHASES = (
+    'save_device_info',
+    'save_sauth_data',
+    'save_current_http_cookies',
+    'save_current_artifacts',
+    'export_sauth_data',
+    'export_http_cookies',
+    'export_cookie_format',
+    'save_nemc_cookie_format',
+    'export_from_restored_session',
+    'export_bundle',
+)
+
+# Reads back the TUI summary on every refresh; only profiled when they run inside a phase.
+STORAGE_LOAD_PHASES = (
+    'load_device_info',
+    'load_sauth_data',
+    'load_current_http_cookies',
+    'restore_session_snapshot',
+)
+
+_profile_lock = threading.Lock()
+_active = threading.local()
+
+
+def profiling_enabled():
+    return os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _function_restriction(func):
+    code = getattr(func, '__func__', func).__code__
+    return re.escape(f"{code.co_filename}:{code.co_firstlineno}({code.co_name})")
+
+
+def _report_text(phase, elapsed, profiler, snapshot, nested):
+    stream = io.StringIO()
+    stream.write(f"phase: {phase}\n")
+    stream.write(f"wall_time: {elapsed:.6f}s\n\n")
+    stream.write(f"== top {TOP_LIMIT} functions by cumulative time ==\n")
+    stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+    stats.print_stats(TOP_LIMIT)
+    stream.write(f"\n== top {TOP_LIMIT} allocation sites ==\n")
+    for stat in snapshot.statistics('lineno')[:TOP_LIMIT]:
+        stream.write(f"{stat}\n")
+    for nested_phase, restriction in nested.items():
+        stream.write(f"\n== nested {nested_phase} ==\n")
+        stats.print_stats(restriction)
+        stats.print_callees(restriction)
+    return stream.getvalue()
+
+
+def _write_report(report_dir, phase, text):
+    path = os.path.join(report_dir, f"{phase}_{time.strftime('%Y%m%d_%H%M%S')}_{time.perf_counter_ns()}.txt")
+    try:
+        os.makedirs(report_dir, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return {'status': 'success', 'path': path}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'path': path}
+
+
+def _attach_report_error(result, report):
+    if isinstance(result, dict) and 'status' in result and 'phase' in result:
+        result['profile_report_error'] = report['error']
+
+
+def profile_call(func, phase, report_dir, errors, top_level=True):
+    restriction = _function_restriction(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        state = getattr(_active, 'state', None)
+        if state is not None:
+            # Nested phases are already in the enclosing profile; only label them for its report.
+            state['nested'].setdefault(phase, restriction)
+            return func(*args, **kwargs)
+        if not top_level:
+            return func(*args, **kwargs)
+        # cProfile and tracemalloc are process-wide; a phase on another thread runs unprofiled.
+        if not _profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        started_tracing = not tracemalloc.is_tracing()
+        profiler = cProfile.Profile()
+        _active.state = {'phase': phase, 'nested': {}}
+        result = None
+        start = time.perf_counter()
+        try:
+            if started_tracing:
+                tracemalloc.start()
+            result = profiler.runcall(func, *args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            nested = _active.state['nested']
+            _active.state = None
+            _profile_lock.release()
+            report = _write_report(report_dir, phase, _report_text(phase, elapsed, profiler, snapshot, nested))
+            if report['status'] != 'success':
+                errors.append(report)
+                _attach_report_error(result, report)
+    return wrapper
+
+
+def install_profiling(workflow, storage=None, report_dir=None):
+    if not profiling_enabled():
+        return {'status': 'idle', 'message': f'未开启性能分析（设置 {PROFILE_ENV}=1 启用）', 'phases': []}
+    storage = storage or workflow.auth.storage
+    report_dir = report_dir or storage._artifact_path(PROFILE_DIR)
+    errors = []
+    phases = []
+    for name in WORKFLOW_PHASES:
+        setattr(workflow, name, profile_call(getattr(workflow, name), f"workflow_{name}", report_dir, errors))
+        phases.append(f"workflow.{name}")
+    for name in STORAGE_SAVE_PHASES + STORAGE_LOAD_PHASES:
+        top_level = name in STORAGE_SAVE_PHASES
+        setattr(storage, name, profile_call(getattr(storage, name), f"storage_{name}", report_dir, errors, top_level))
+        phases.append(f"storage.{name}")
+    return {'status': 'success', 'message': f'性能分析已开启，报告写入 {report_dir}', 'phases': phases, 'report_dir': report_dir, 'errors': errors}
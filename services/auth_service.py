@@ -7,20 +7,27 @@ import json
 import random
 import re
 import string
+import threading
 import time
 import uuid
+from contextlib import contextmanager
 from urllib.parse import parse_qs, quote, urlparse
 
 import requests
 
+from services.cassette_service import install_cassette
+from services.deadline import DEFAULT_TIMEOUT, DeadlineExceeded
 from services.storage_service import StorageService
 from services.verify_service import VerifyService, _normalize_login_1351
 
 
 class NetEaseAuthService:
-    def __init__(self, use_dynamic_device_id=False, storage=None):
+    def __init__(self, use_dynamic_device_id=False, storage=None, cassette_mode=None, cassette_path=None):
         self.session = requests.Session()
         self.storage = storage or StorageService('.')
+        self.cassette = install_cassette(self.session, self.storage, cassette_mode, cassette_path)
+        if self.cassette.get('storage'):
+            self.storage = self.cassette['storage']
         self.device_id = None
         self.device_key = None
         self.udid = None
@@ -31,6 +38,8 @@ class NetEaseAuthService:
         self.last_artifacts = {}
         self.last_mailbox = None
         self.last_error = None
+        self._deadline_local = threading.local()
+        self.session.hooks['response'].append(self._enforce_deadline)
 
         saved_device = self.storage.load_device_info()
         self.device_info = self._generate_device_info(use_dynamic_device_id)
@@ -65,6 +74,7 @@ class NetEaseAuthService:
             self.session,
             device_payload_getter=self._verification_payload,
             headers_getter=self._verification_headers,
+            requester=self._request,
         )
 
     def _result(self, status, message='', **kwargs):
@@ -72,6 +82,35 @@ class NetEaseAuthService:
         payload.update(kwargs)
         return payload
 
+    @contextmanager
+    def deadline_scope(self, deadline):
+        previous = getattr(self._deadline_local, 'deadline', None)
+        self._deadline_local.deadline = deadline
+        try:
+            yield deadline
+        finally:
+            self._deadline_local.deadline = previous
+
+    def _request(self, method, url, phase, **kwargs):
+        deadline = getattr(self._deadline_local, 'deadline', None)
+        if deadline is None:
+            return self.session.request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs)
+        self._deadline_local.phase = phase
+        try:
+            return self.session.request(method, url, timeout=deadline.timeout(phase), **kwargs)
+        except requests.exceptions.Timeout as e:
+            # A timeout clamped to the remaining budget means the budget ran out, not the server.
+            if deadline.spent():
+                raise DeadlineExceeded(phase, deadline.remaining(), deadline.budget) from e
+            raise
+
+    def _enforce_deadline(self, response, *args, **kwargs):
+        # requests applies the read timeout per socket read, so re-check the budget once the response is in.
+        deadline = getattr(self._deadline_local, 'deadline', None)
+        if deadline is not None:
+            deadline.check(getattr(self._deadline_local, 'phase', ''))
+        return response
+
     def _random_hex(self, length):
         return ''.join(random.choice('0123456789abcdef') for _ in range(length))
 
@@ -203,7 +242,7 @@ class NetEaseAuthService:
         url = f"https://service.mkey.163.com/mpay/games/{self.device_info['game_id']}/devices"
         data = {**self._device_payload(), **self._app_payload(), 'mac': self.device_info['mac']}
         try:
-            response = self.session.post(url, data=data, headers=self._get_headers(), timeout=30)
+            response = self._request('POST', url, 'preparing_device', data=data, headers=self._get_headers())
             result = response.json()
             if response.status_code == 201 and 'device' in result and result['device'].get('key'):
                 self.device_key = result['device']['key']
@@ -212,6 +251,8 @@ class NetEaseAuthService:
                 save_result = self.storage.save_device_info(self.device_id, self.device_key, self.udid, self.device_info.get('unique_id', ''))
                 return self._result('success', '设备创建成功', device=result['device'], save_result=save_result)
             return self._result('failed', '设备创建失败', response_code=response.status_code, error=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '设备创建异常', error=str(e))
@@ -221,11 +262,13 @@ class NetEaseAuthService:
         url = 'https://service.mkey.163.com/mpay/api/devices/upload'
         data = {'device_id': self.device_info['device_id'], 'version': self.device_info['version'], 'mac': self.device_info['mac'], **self._device_payload(), **self._app_payload(), 'ci_code': self.device_info['ci_code']}
         try:
-            response = self.session.post(url, data=data, headers=self._get_headers(), timeout=30)
+            response = self._request('POST', url, 'preparing_device', data=data, headers=self._get_headers())
             result = response.json()
             if result.get('upload_time') is not None:
                 return self._result('success', '设备信息上传成功', data=result)
             return self._result('failed', '设备信息上传失败', error=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '设备信息上传异常', error=str(e))
@@ -300,7 +343,7 @@ class NetEaseAuthService:
         self._refresh_transactions()
         data = {'opt_fields': 'nickname,avatar,realname_status,mobile_bind_status,exit_popup_info,mask_related_mobile,related_login_status,detect_is_new_user', 'params': self.calculate_params(username=email, password_md5=password_md5), **self._app_payload()}
         try:
-            result = self.session.post(url, data=data, headers=self._get_headers(), timeout=30).json()
+            result = self._request('POST', url, 'logging_in', data=data, headers=self._get_headers()).json()
             if result.get('userid') or result.get('user'):
                 artifacts = self._finalize_auth_state(result.get('user', {}), email)
                 return self._result('success', '登录成功', login_mode='email', user_info=result, sauth_data=self.sauth_data, artifacts=artifacts)
@@ -317,6 +360,8 @@ class NetEaseAuthService:
                     return retry
                 return self._result('failed', '设备重建后仍无法登录', error=result, rebuild_result=rebuilt)
             return self._result('failed', result.get('reason', '登录失败'), error=result, error_code=result.get('code'), error_reason=result.get('reason', '登录失败'))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '邮箱登录异常', error=str(e))
@@ -327,10 +372,12 @@ class NetEaseAuthService:
         url = 'https://service.mkey.163.com/mpay/api/users/login/mobile/get_sms'
         data = {**self._app_payload(), 'device_id': self.device_info['device_id'], 'mobile': phone_number, 'urs_udid': self.device_info['urs_udid']}
         try:
-            result = self.session.post(url, data=data, headers=self._get_headers(), timeout=30).json()
+            result = self._request('POST', url, 'requesting_sms', data=data, headers=self._get_headers()).json()
             if result.get('reply_sms') or result.get('code') in (0, 200, 201):
                 return self._result('success', result.get('reason', '短信验证码已请求'), phone_number=phone_number, data=result)
             return self._result('failed', result.get('reason', '请求短信验证码失败'), error=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '请求短信验证码异常', error=str(e))
@@ -340,10 +387,12 @@ class NetEaseAuthService:
         url = 'https://service.mkey.163.com/mpay/api/users/login/mobile/verify_sms'
         data = {**self._app_payload(), 'device_id': self.device_info['device_id'], 'mobile': phone_number, 'login_for': '1', 'smscode': verify_code, 'up_content': '', 'urs_udid': self.device_info['urs_udid']}
         try:
-            result = self.session.post(url, data=data, headers=self._get_headers(), timeout=30).json()
+            result = self._request('POST', url, 'logging_in', data=data, headers=self._get_headers()).json()
             if result.get('ticket'):
                 return self._result('success', result.get('reason', '短信验证码校验成功'), ticket=result.get('ticket'), related_emails=result.get('related_emails', []), related_accounts=result.get('related_accounts', []), data=result)
             return self._result('failed', result.get('reason', '短信验证码校验失败'), error=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '短信验证码校验异常', error=str(e))
@@ -355,11 +404,13 @@ class NetEaseAuthService:
         params = {'un': quote(base64.b64encode(phone_number.encode('utf-8')).decode('utf-8'))}
         data = {**self._app_payload(), 'device_id': self.device_info['device_id'], 'login_for': '1', 'ticket': ticket, 'urs_udid': self.device_info['urs_udid'], 'opt_fields': 'nickname,avatar,realname_status,mobile_bind_status,exit_popup_info,mask_related_mobile,related_login_status,detect_is_new_user'}
         try:
-            result = self.session.post(url, data=data, params=params, headers=self._get_headers(), timeout=30).json()
+            result = self._request('POST', url, 'logging_in', data=data, params=params, headers=self._get_headers()).json()
             if result.get('user'):
                 artifacts = self._finalize_auth_state(result.get('user', {}), phone_number)
                 return self._result('success', '手机号登录成功', login_mode='phone', user_info=result, sauth_data=self.sauth_data, artifacts=artifacts)
             return self._result('failed', result.get('reason', '手机号登录失败'), error=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '手机号登录异常', error=str(e))
@@ -391,9 +442,11 @@ class NetEaseAuthService:
         url = 'https://mailbox.g.mkey.163.com/mpay/api/mailbox/fetch_list'
         params = {'game_id': self.device_info['game_id'], 'user_id': self.sauth_data.get('sdkuid'), 'device_id': self.device_info['device_id'], 'token': self.sauth_data.get('sessionid'), 'fetch_type': '0', **self._app_payload()}
         try:
-            result = self.session.get(url, params=params, headers=self._get_headers(), timeout=30).json()
+            result = self._request('GET', url, 'fetching_mailbox', params=params, headers=self._get_headers()).json()
             self.last_mailbox = result
             return self._result('success', '邮箱列表获取成功', mailbox=result)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.last_error = str(e)
             return self._result('error', '获取邮箱列表异常', error=str(e))
@@ -414,6 +467,15 @@ class NetEaseAuthService:
         self.last_export_paths = self._collect_export_paths(self.last_artifacts)
         return self._result('success', '认证产物已导出到专用目录', artifacts=self.last_artifacts, export_paths=self.last_export_paths)
 
+    def export_bundle(self, label, fmt='json', stream=None):
+        if not (self.sauth_data.get('sessionid') and self.sauth_data.get('sdkuid')):
+            return self._result('failed', '当前没有可导出的 SAuth 会话')
+        cookies = self.session.cookies.get_dict()
+        result = self.storage.export_bundle(self.sauth_data, cookies, label, fmt, stream)
+        if result.get('path'):
+            self.last_export_paths = [result['path']]
+        return result
+
     def export_restored_session(self, label='restored_session'):
         result = self.storage.export_from_restored_session(label)
         if result.get('status') == 'success':
@@ -433,6 +495,12 @@ class NetEaseAuthService:
         except Exception:
             return None
 
+    def close(self):
+        self.session.close()
+        cleanup = self.cassette.get('cleanup')
+        if cleanup:
+            cleanup()
+
     def get_state_snapshot(self):
         restored = self.storage.restore_session_snapshot()
         return {
@@ -445,3 +513,4 @@ class NetEaseAuthService:
             'restored_session_exported': self.restored_session_exported,
             'export_paths': self.last_export_paths,
         }
+
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from services.storage_service import StorageService
+
+
+CASSETTE_MODE_ENV = 'NETEASE_CASSETTE_MODE'
+CASSETTE_PATH_ENV = 'NETEASE_CASSETTE'
+CASSETTE_DIR = 'cassettes'
+CASSETTE_VERSION = 2
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+REDACTED = '***REDACTED***'
+REDACTED_REQUEST_FIELDS = {'params', 'password', 'token', 'ticket', 'smscode', 'code', 'mobile', 'un', 'user_id'}
+REDACTED_RESPONSE_FIELDS = {'token', 'key', 'ticket', 'ext_access_token', 'access_token', 'sessionid', 'mobile'}
+REDACTED_QUERY_FIELDS = REDACTED_REQUEST_FIELDS | REDACTED_RESPONSE_FIELDS
+REDACTED_HEADERS = {'cookie', 'set-cookie', 'authorization'}
+DROPPED_RESPONSE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+def _redact_pairs(pairs):
+    return [(key, REDACTED if key in REDACTED_QUERY_FIELDS else value) for key, value in pairs]
+
+
+def _redact_string(value):
+    # verify_url and similar links carry ticket/token in their query string.
+    if '?' not in value or '=' not in value:
+        return value
+    keys = {key for key, _ in parse_qsl(urlparse(value).query, keep_blank_values=True)}
+    if keys & REDACTED_QUERY_FIELDS:
+        return _redact_url(value)
+    return value
+
+
+def _redact_data(data):
+    if isinstance(data, str):
+        return _redact_string(data)
+    if isinstance(data, dict):
+        return {key: REDACTED if key in REDACTED_RESPONSE_FIELDS and value not in (None, '') else _redact_data(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_redact_data(item) for item in data]
+    return data
+
+
+def _redact_headers(headers, dropped=()):
+    result = {}
+    for key, value in (headers or {}).items():
+        lowered = key.lower()
+        if lowered in dropped:
+            continue
+        result[key] = REDACTED if lowered in REDACTED_HEADERS else value
+    return result
+
+
+def _redact_url(url):
+    parsed = urlparse(url)
+    query = urlencode(_redact_pairs(parse_qsl(parsed.query, keep_blank_values=True)), safe='*')
+    return urlunparse(parsed._replace(query=query))
+
+
+def _request_body(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    return _redact_pairs(parse_qsl(body, keep_blank_values=True))
+
+
+def _response_body(response):
+    try:
+        return {'json': _redact_data(response.json())}
+    except ValueError:
+        return {'text': response.text}
+
+
+def _match_key(method, url):
+    parsed = urlparse(url)
+    return f"{method.upper()} {parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+
+def cassette_dir(storage):
+    return storage._artifact_path(CASSETTE_DIR)
+
+
+def new_cassette_path(storage, name='session'):
+    return os.path.join(cassette_dir(storage), f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+
+def latest_cassette_path(storage):
+    try:
+        names = sorted(name for name in os.listdir(cassette_dir(storage)) if name.endswith('.jsonl'))
+    except FileNotFoundError:
+        return None
+    return os.path.join(cassette_dir(storage), names[-1]) if names else None
+
+
+def _recorded_device(storage):
+    device = storage.load_device_info() or {}
+    if not device.get('device_id'):
+        return None
+    return {'device_id': device['device_id'], 'udid': device.get('udid', ''), 'unique_id': device.get('unique_id', ''), 'has_key': bool(device.get('device_key'))}
+
+
+def create_cassette(path, metadata):
+    # One header line, then one appended line per interaction; an existing cassette is never overwritten.
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'x', encoding='utf-8') as f:
+            f.write(json.dumps({'version': CASSETTE_VERSION, 'metadata': metadata}, ensure_ascii=False) + '\n')
+        return {'status': 'success', 'path': path}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'path': path}
+
+
+def append_interaction(path, interaction):
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(interaction, ensure_ascii=False) + '\n')
+        return {'status': 'success', 'path': path}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'path': path}
+
+
+def load_cassette(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get('version') != CASSETTE_VERSION:
+            return {'status': 'error', 'error': '不是有效的 cassette 文件', 'path': path, 'metadata': {}, 'interactions': []}
+        return {'status': 'success', 'path': path, 'metadata': lines[0].get('metadata', {}), 'interactions': lines[1:]}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'path': path, 'metadata': {}, 'interactions': []}
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self.count = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Read the body inside the timed window so replay reproduces the full transfer time.
+        response.content
+        elapsed = time.perf_counter() - start
+        interaction = {
+            'request': {
+                'method': request.method,
+                'url': _redact_url(request.url),
+                'match': _match_key(request.method, request.url),
+                'headers': _redact_headers(request.headers),
+                'body': _request_body(request.body),
+            },
+            'response': {
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'headers': _redact_headers(response.headers, DROPPED_RESPONSE_HEADERS),
+                'encoding': response.encoding,
+                **_response_body(response),
+            },
+            'elapsed': elapsed,
+        }
+        with self._lock:
+            result = append_interaction(self.path, interaction)
+            if result['status'] == 'success':
+                self.count += 1
+            else:
+                self.errors.append(result)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, interactions, replay_timing=True):
+        super().__init__()
+        self.replay_timing = replay_timing
+        self.interactions = interactions
+        self.cursor = 0
+        self._lock = threading.Lock()
+
+    def _next_interaction(self, match):
+        with self._lock:
+            for index in range(self.cursor, len(self.interactions)):
+                if self.interactions[index]['request'].get('match') == match:
+                    self.cursor = index + 1
+                    return self.interactions[index]
+        return None
+
+    def send(self, request, **kwargs):
+        match = _match_key(request.method, request.url)
+        interaction = self._next_interaction(match)
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(f"cassette 中没有匹配的请求: {match}", request=request)
+        elapsed = interaction.get('elapsed', 0) or 0
+        if self.replay_timing and elapsed > 0:
+            time.sleep(elapsed)
+        recorded = interaction['response']
+        if 'json' in recorded:
+            content = json.dumps(recorded['json'], ensure_ascii=False).encode('utf-8')
+            encoding = 'utf-8'
+        else:
+            encoding = recorded.get('encoding') or 'utf-8'
+            content = (recorded.get('text') or '').encode(encoding)
+        response = requests.Response()
+        response.status_code = recorded.get('status_code', 200)
+        response.reason = recorded.get('reason', '')
+        response.headers = CaseInsensitiveDict(recorded.get('headers', {}))
+        response.encoding = encoding
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=elapsed)
+        return response
+
+    def close(self):
+        pass
+
+
+def _seed_replay_storage(storage, device):
+    # Seed the recorded device so replay takes the same reuse/create branch as the recording did.
+    if device:
+        storage.save_device_info(device['device_id'], REDACTED if device.get('has_key') else '', device.get('udid', ''), device.get('unique_id', ''))
+
+
+def install_cassette(session, storage, mode=None, path=None, replay_timing=True):
+    mode = (mode if mode is not None else os.environ.get(CASSETTE_MODE_ENV, '')).strip().lower()
+    if mode not in (MODE_RECORD, MODE_REPLAY):
+        return {'status': 'idle', 'message': f'未开启 HTTP cassette（设置 {CASSETTE_MODE_ENV}=record|replay 启用）', 'mode': None}
+    path = path or os.environ.get(CASSETTE_PATH_ENV)
+    if mode == MODE_RECORD:
+        path = path or new_cassette_path(storage)
+        created = create_cassette(path, {'created_time': int(time.time()), 'device': _recorded_device(storage)})
+        if created['status'] != 'success':
+            return {'status': 'failed', 'message': f'无法创建 cassette {path}（不会覆盖已有录制），未开启录制', 'mode': mode, 'path': path, 'error': created['error']}
+        adapter = RecordingAdapter(path)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return {'status': 'success', 'message': f'HTTP 请求将录制到 {path}', 'mode': mode, 'path': path, 'adapter': adapter}
+    path = path or latest_cassette_path(storage)
+    if not path:
+        return {'status': 'failed', 'message': f'{cassette_dir(storage)} 中没有 cassette，未开启离线回放', 'mode': mode, 'path': None}
+    loaded = load_cassette(path)
+    if loaded['status'] != 'success':
+        return {'status': 'failed', 'message': f'无法读取 cassette {path}，未开启离线回放', 'mode': mode, 'path': path, 'error': loaded['error']}
+    if not loaded['interactions']:
+        return {'status': 'failed', 'message': f'cassette {path} 中没有可回放的请求，未开启离线回放', 'mode': mode, 'path': path}
+    adapter = ReplayAdapter(loaded['interactions'], replay_timing)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Replayed responses carry redacted keys and tokens; persist them to a throwaway
+    # directory so a replay never overwrites the real device or session state.
+    replay_storage = StorageService(tempfile.mkdtemp(prefix='netease_replay_'))
+    _seed_replay_storage(replay_storage, loaded['metadata'].get('device'))
+    cleanup = weakref.finalize(session, shutil.rmtree, replay_storage.base_dir, True)
+    return {
+        'status': 'success', 'message': f'HTTP 请求将从 {path} 离线回放，回放产物写入 {replay_storage.base_dir}',
+        'mode': mode, 'path': path, 'count': len(adapter.interactions), 'adapter': adapter, 'storage': replay_storage, 'cleanup': cleanup,
+    }
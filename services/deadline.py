@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 25.0
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+MIN_CALL_BUDGET = 2.0
+DEFAULT_WORKFLOW_BUDGET = 90.0
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, phase, remaining, budget):
+        super().__init__(f"{phase}: 剩余时间预算 {remaining:.1f}s 不足以完成下一次请求")
+        self.phase = phase
+        self.remaining = remaining
+        self.budget = budget
+
+    def to_result(self):
+        return {
+            'status': 'timeout',
+            'message': '流程时间预算已耗尽，已提前终止',
+            'phase': self.phase,
+            'deadline_exceeded': True,
+            'remaining_budget': round(max(self.remaining, 0.0), 3),
+            'budget': self.budget,
+        }
+
+
+class Deadline:
+    def __init__(self, budget=DEFAULT_WORKFLOW_BUDGET):
+        self.budget = float(budget)
+        self.expires_at = time.monotonic() + self.budget
+
+    @classmethod
+    def coerce(cls, deadline, default=DEFAULT_WORKFLOW_BUDGET):
+        if isinstance(deadline, cls):
+            return deadline
+        return cls(default if deadline is None else deadline)
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def check(self, phase):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(phase, remaining, self.budget)
+        return remaining
+
+    def spent(self):
+        return self.remaining() < MIN_CALL_BUDGET
+
+    def timeout(self, phase):
+        remaining = self.remaining()
+        if remaining < MIN_CALL_BUDGET:
+            raise DeadlineExceeded(phase, remaining, self.budget)
+        return (min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining))
@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
 import json
 import os
 import time
+import zipfile
+
+
+BUNDLE_FORMAT = 'netease-auth-bundle'
+BUNDLE_VERSION = 2
+NEMC_REQUIRED_FIELDS = ['sdkuid', 'sessionid', 'deviceid', 'udid']
+
+
+def _compact_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
 
 
 class StorageService:
@@ -133,6 +144,53 @@ class StorageService:
             'export_http_cookies': self.export_http_cookies(cookies, label),
         }
 
+    def build_bundle(self, sauth_data, cookies, label):
+        # SAuth is stored once as a native object; NEMC consumers wrap it as {'sauth_json': <compact sauth>}.
+        missing_fields = [field for field in NEMC_REQUIRED_FIELDS if not sauth_data.get(field)]
+        return {
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'sauth': sauth_data,
+            'http_cookies': cookies,
+            'metadata': {
+                'label': label,
+                'created_time': int(time.time()),
+                'cookie_count': len(cookies),
+                'nemc_ready': not missing_fields,
+                'missing_fields': missing_fields,
+            },
+        }
+
+    def _encode_bundle(self, bundle, fmt):
+        if fmt == 'zip':
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for name in ('sauth', 'http_cookies', 'metadata'):
+                    archive.writestr(f"{name}.json", _compact_json(bundle[name]))
+            return buffer.getvalue()
+        return _compact_json(bundle).encode('utf-8')
+
+    def export_bundle(self, sauth_data, cookies, label, fmt='json', stream=None):
+        if fmt not in ('json', 'zip'):
+            return {'status': 'failed', 'message': f'不支持的导出格式: {fmt}'}
+        bundle = self.build_bundle(sauth_data, cookies, label)
+        payload = self._encode_bundle(bundle, fmt)
+        if stream is not None:
+            target = getattr(stream, 'buffer', stream)
+            try:
+                target.write(payload)
+                target.flush()
+                return {'status': 'success', 'message': '认证产物包已写入输出流', 'format': fmt, 'size': len(payload)}
+            except Exception as e:
+                return {'status': 'error', 'message': '写入认证产物包失败', 'error': str(e)}
+        path = self._artifact_path(self._artifact_filename('bundle', label, ext=fmt))
+        try:
+            with open(path, 'wb') as f:
+                f.write(payload)
+            return {'status': 'success', 'message': '认证产物包已导出', 'path': path, 'format': fmt, 'size': len(payload)}
+        except Exception as e:
+            return {'status': 'error', 'message': '导出认证产物包失败', 'error': str(e), 'path': path}
+
     def restore_session_snapshot(self):
         device = self.load_current_device_info() or {}
         sauth = self.load_current_sauth_payload()
@@ -208,8 +266,7 @@ class StorageService:
         return self.export_cookie_format(sauth_data, label)
 
     def save_nemc_cookie_format(self, sauth_data, label, filename=None):
-        required_fields = ['sdkuid', 'sessionid', 'deviceid', 'udid']
-        missing_fields = [field for field in required_fields if not sauth_data.get(field)]
+        missing_fields = [field for field in NEMC_REQUIRED_FIELDS if not sauth_data.get(field)]
         if missing_fields:
             return {'status': 'failed', 'message': 'SAuth 缺少必要字段', 'missing_fields': missing_fields}
         try:
@@ -300,8 +357,7 @@ class StorageService:
         return result
 
     def save_nemc_cookie_format(self, sauth_data, label, filename=None):
-        required_fields = ['sdkuid', 'sessionid', 'deviceid', 'udid']
-        missing_fields = [field for field in required_fields if not sauth_data.get(field)]
+        missing_fields = [field for field in NEMC_REQUIRED_FIELDS if not sauth_data.get(field)]
         if missing_fields:
             return {'status': 'failed', 'message': 'SAuth 缺少必要字段', 'missing_fields': missing_fields}
         try:
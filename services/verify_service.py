@@ -5,6 +5,8 @@ import json
 
 from urllib.parse import parse_qs, urlparse
 
+from services.deadline import DEFAULT_TIMEOUT, DeadlineExceeded
+
 
 VERIFY_REQUIRED = 'verify_required'
 VERIFY_PENDING = 'verify_pending'
@@ -508,10 +510,11 @@ def _sms_json_to_payload(data):
 
 
 class VerifyService:
-    def __init__(self, session, device_payload_getter=None, headers_getter=None):
+    def __init__(self, session, device_payload_getter=None, headers_getter=None, requester=None):
         self.session = session
         self.device_payload_getter = device_payload_getter
         self.headers_getter = headers_getter
+        self.requester = requester
 
     def _base_payload(self):
         if self.device_payload_getter:
@@ -527,6 +530,11 @@ class VerifyService:
             'X-Requested-With': 'XMLHttpRequest',
         }
 
+    def _post(self, url, phase, **kwargs):
+        if self.requester:
+            return self.requester('POST', url, phase, **kwargs)
+        return self.session.post(url, timeout=DEFAULT_TIMEOUT, **kwargs)
+
     def parse_verify_url(self, verify_url):
         parsed_url = urlparse(verify_url or '')
         params = parse_qs(parsed_url.query)
@@ -545,8 +553,10 @@ class VerifyService:
         url = 'https://service.mkey.163.com/mpay/api/reverify/send_sms'
         data = {'ticket': ticket, 'lang': '', **self._base_payload()}
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'sending_verify_sms', data=data, headers=self._headers())
             return _sms_response_payload(response)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return _error_with_phase('短信验证码发送异常', error=str(e))
 
@@ -556,8 +566,10 @@ class VerifyService:
         if code:
             data['code'] = code
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'waiting_verify', data=data, headers=self._headers())
             return _submit_response_payload(response)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return _error_with_phase('提交验证结果异常', error=str(e))
 
@@ -565,8 +577,10 @@ class VerifyService:
         url = 'https://service.mkey.163.com/mpay/api/reverify/check_status'
         data = {'ticket': ticket, **self._base_payload()}
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'polling_verify', data=data, headers=self._headers())
             return _poll_response_payload(response)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return _error_with_phase('检查验证状态失败', error=str(e))
 
@@ -595,10 +609,11 @@ __all__ = [
 
 
 class VerifyService:
-    def __init__(self, session, device_payload_getter=None, headers_getter=None):
+    def __init__(self, session, device_payload_getter=None, headers_getter=None, requester=None):
         self.session = session
         self.device_payload_getter = device_payload_getter
         self.headers_getter = headers_getter
+        self.requester = requester
 
     def _base_payload(self):
         if self.device_payload_getter:
@@ -614,6 +629,11 @@ class VerifyService:
             'X-Requested-With': 'XMLHttpRequest',
         }
 
+    def _post(self, url, phase, **kwargs):
+        if self.requester:
+            return self.requester('POST', url, phase, **kwargs)
+        return self.session.post(url, timeout=DEFAULT_TIMEOUT, **kwargs)
+
     def parse_verify_url(self, verify_url):
         parsed_url = urlparse(verify_url or '')
         params = parse_qs(parsed_url.query)
@@ -634,11 +654,13 @@ class VerifyService:
         url = 'https://service.mkey.163.com/mpay/api/reverify/send_sms'
         data = {'ticket': ticket, 'lang': '', **self._base_payload()}
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'sending_verify_sms', data=data, headers=self._headers())
             result = response.json()
             if result.get('code') == 200:
                 return {'status': 'success', 'message': '短信验证码已发送', 'data': result}
             return {'status': 'failed', 'message': result.get('reason', '短信验证码发送失败'), 'error': result}
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {'status': 'error', 'message': '短信验证码发送异常', 'error': str(e)}
 
@@ -648,13 +670,15 @@ class VerifyService:
         if code:
             data['code'] = code
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'waiting_verify', data=data, headers=self._headers())
             result = response.json()
             if 'user' in result and result['user'].get('token'):
                 return {'status': 'success', 'message': '验证成功', 'user_info': result['user'], 'token': result['user']['token'], 'data': result}
             if result.get('code') == 1351:
                 return {'status': 'pending', 'message': '验证尚未完成', 'data': result}
             return {'status': 'failed', 'message': result.get('reason', '验证失败'), 'error': result}
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {'status': 'error', 'message': '提交验证结果异常', 'error': str(e)}
 
@@ -662,8 +686,10 @@ class VerifyService:
         url = 'https://service.mkey.163.com/mpay/api/reverify/check_status'
         data = {'ticket': ticket, **self._base_payload()}
         try:
-            response = self.session.post(url, data=data, headers=self._headers(), timeout=30)
+            response = self._post(url, 'polling_verify', data=data, headers=self._headers())
             return {'status': 'success', 'message': '验证状态已更新', 'data': response.json()}
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {'status': 'error', 'message': '检查验证状态失败', 'error': str(e)}
 
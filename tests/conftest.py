@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubAdapter(BaseAdapter):
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = replies
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.timeouts.append(kwargs.get('timeout'))
+        path = request.path_url.split('?')[0]
+        delay, body = next(reply for suffix, reply in self.replies.items() if path.endswith(suffix))
+        time.sleep(delay)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode('utf-8')
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def stubbed_auth(tmp_path):
+    from services.auth_service import NetEaseAuthService
+    from services.storage_service import StorageService
+
+    def build(replies, device_key='00' * 16):
+        auth = NetEaseAuthService(storage=StorageService(str(tmp_path)), cassette_mode='')
+        auth.device_key = device_key
+        adapter = StubAdapter(replies)
+        auth.session.mount('https://', adapter)
+        return auth, adapter
+    return build
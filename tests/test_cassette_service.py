@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from services.auth_service import NetEaseAuthService
+from services.cassette_service import (
+    MODE_RECORD,
+    MODE_REPLAY,
+    REDACTED,
+    ReplayAdapter,
+    _match_key,
+    _redact_data,
+    _redact_url,
+    _request_body,
+    append_interaction,
+    create_cassette,
+    install_cassette,
+    load_cassette,
+)
+from services.storage_service import StorageService
+from workflow import AuthWorkflow
+
+
+GAME = 'https://service.mkey.163.com/mpay'
+
+
+def interaction(method, url, body, status_code=200):
+    return {'request': {'method': method, 'url': url, 'match': _match_key(method, url)}, 'response': {'status_code': status_code, 'json': body}, 'elapsed': 0}
+
+
+def write_cassette(path, interactions, device=None):
+    create_cassette(str(path), {'device': device})
+    for item in interactions:
+        append_interaction(str(path), item)
+    return str(path)
+
+
+class TokenHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({'user': {'id': 'u', 'token': 'SECRET'}, 'verify_url': 'https://h/v?ticket=TICKET&code=1'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Set-Cookie', 'sid=SECRET')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(('127.0.0.1', 0), TokenHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_redaction_covers_keys_urls_and_bodies():
+    data = {'user': {'token': 't', 'id': 'u', 'items': [{'key': 'k'}]}, 'code': 1351, 'ticket': '',
+            'verify_url': 'https://h/v?ticket=SECRET&code=9&chg_pwd=0', 'avatar': 'https://h/a.png?size=1'}
+    redacted = _redact_data(data)
+    assert redacted['user'] == {'token': REDACTED, 'id': 'u', 'items': [{'key': REDACTED}]}
+    assert redacted['code'] == 1351 and redacted['ticket'] == ''
+    assert 'SECRET' not in redacted['verify_url'] and 'chg_pwd=0' in redacted['verify_url']
+    assert redacted['avatar'] == data['avatar']
+    url = _redact_url('https://h/p?un=YUBiLmM%3D&game_id=x19&token=s')
+    assert 'YUBiLmM' not in url and 'game_id=x19' in url and url.count(REDACTED) == 2
+    assert _request_body(b'password=p&a=1') == [('password', REDACTED), ('a', '1')]
+
+
+def test_replay_matches_in_order_per_method_and_path():
+    session = requests.Session()
+    session.mount('https://', ReplayAdapter([
+        interaction('POST', 'https://h/a', {'n': 1}), interaction('POST', 'https://h/b', {'n': 2}), interaction('POST', 'https://h/a', {'n': 3}),
+    ], replay_timing=False))
+    assert session.post('https://h/b?x=1').json() == {'n': 2}
+    assert session.post('https://h/a').json() == {'n': 3}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.post('https://h/a')
+
+
+def test_replay_fails_without_usable_cassette(tmp_path):
+    storage = StorageService(str(tmp_path))
+    assert install_cassette(requests.Session(), storage, MODE_REPLAY)['status'] == 'failed'
+    assert install_cassette(requests.Session(), storage, MODE_REPLAY, str(tmp_path / 'missing.jsonl'))['status'] == 'failed'
+    (tmp_path / 'corrupt.jsonl').write_text('{not json')
+    assert install_cassette(requests.Session(), storage, MODE_REPLAY, str(tmp_path / 'corrupt.jsonl'))['status'] == 'failed'
+    empty = write_cassette(tmp_path / 'empty.jsonl', [])
+    result = install_cassette(requests.Session(), storage, MODE_REPLAY, empty)
+    assert result['status'] == 'failed' and 'storage' not in result
+
+
+def test_record_appends_redacted_lines_and_never_overwrites(tmp_path, server):
+    storage = StorageService(str(tmp_path))
+    session = requests.Session()
+    recorded = install_cassette(session, storage, MODE_RECORD)
+    assert recorded['status'] == 'success' and recorded['path'].endswith('.jsonl')
+    session.post(f"{server}/login?un=abc", data={'password': 'p', 'a': '1'}, timeout=5)
+    session.post(f"{server}/login", data={'a': '2'}, timeout=5)
+    with open(recorded['path'], encoding='utf-8') as f:
+        raw = f.read()
+    assert 'SECRET' not in raw and 'TICKET' not in raw
+    loaded = load_cassette(recorded['path'])
+    assert loaded['interactions'][0]['request']['body'] == [['password', REDACTED], ['a', '1']]
+    assert loaded['status'] == 'success' and len(loaded['interactions']) == 2 and recorded['adapter'].count == 2
+
+    again = install_cassette(requests.Session(), storage, MODE_RECORD, recorded['path'])
+    assert again['status'] == 'failed'
+    assert len(load_cassette(recorded['path'])['interactions']) == 2
+
+
+def test_replay_reuses_recorded_device_and_never_touches_real_storage(tmp_path):
+    real = tmp_path / 'real'
+    storage = StorageService(str(real))
+    path = write_cassette(tmp_path / 'login.jsonl', [
+        interaction('POST', f'{GAME}/api/devices/upload', {'upload_time': 1}),
+        interaction('POST', f'{GAME}/games/aecfrxodyqaaaajp-g-x19/devices/dev-1/users', {'user': {'id': 'u', 'token': REDACTED}}),
+    ], device={'device_id': 'dev-1', 'udid': 'abcd', 'unique_id': 'uid', 'has_key': True})
+    auth = NetEaseAuthService(storage=storage, cassette_mode=MODE_REPLAY, cassette_path=path)
+    assert auth.cassette['status'] == 'success' and auth.storage is not storage
+    auth.cassette['adapter'].replay_timing = False
+    replay_dir = auth.storage.base_dir
+
+    result = AuthWorkflow(auth).run_email_login('a@b.c', 'pw')
+    assert result['status'] == 'success', result
+    assert os.listdir(real / 'artifacts') == []
+    assert not os.path.exists(real / 'device_info.json') and not os.path.exists(real / 'sauth_data.json')
+
+    auth.close()
+    assert not os.path.exists(replay_dir)
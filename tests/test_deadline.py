@@ -0,0 +1,88 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from services.deadline import CONNECT_TIMEOUT, DEFAULT_TIMEOUT, READ_TIMEOUT, Deadline, DeadlineExceeded
+from workflow import AuthWorkflow
+
+
+def test_timeout_gives_read_the_full_remaining_budget():
+    assert Deadline(60).timeout('x') == (CONNECT_TIMEOUT, READ_TIMEOUT)
+    connect, read = Deadline(10).timeout('x')
+    assert connect == CONNECT_TIMEOUT and 9.9 < read <= 10
+    connect, read = Deadline(3).timeout('x')
+    assert 2.9 < connect <= 3 and 2.9 < read <= 3
+    with pytest.raises(DeadlineExceeded) as exc:
+        Deadline(1).timeout('preparing_device')
+    assert exc.value.phase == 'preparing_device'
+
+
+def test_requests_outside_a_workflow_use_the_default_timeout(stubbed_auth):
+    auth, adapter = stubbed_auth({'/devices/upload': (0, {'upload_time': 1})})
+    assert auth.upload_device_details()['status'] == 'success'
+    assert adapter.timeouts == [DEFAULT_TIMEOUT]
+
+
+def test_deadline_survives_the_1311_rebuild_inside_login_try(stubbed_auth):
+    auth, _ = stubbed_auth({'/devices/upload': (0, {'upload_time': 1}), '/users': (1.5, {'code': 1311, 'reason': 'rebuild'})})
+    result = AuthWorkflow(auth).run_email_login('a@b.c', 'pw', deadline=3)
+    assert result['status'] == 'timeout' and result['deadline_exceeded'] and result['phase'] == 'preparing_device', result
+
+
+def test_response_after_the_budget_is_rejected(stubbed_auth):
+    auth, _ = stubbed_auth({'/devices/upload': (2.2, {'upload_time': 1})})
+    result = AuthWorkflow(auth).run_email_login('a@b.c', 'pw', deadline=2.1)
+    assert result['status'] == 'timeout' and result['phase'] == 'preparing_device', result
+
+
+@pytest.fixture
+def silent_server():
+    # Accepts connections but never answers, so only the read timeout can end a request.
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    accepted = []
+    stop = threading.Event()
+
+    def accept():
+        listener.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                accepted.append(listener.accept()[0])
+            except OSError:
+                continue
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}"
+    stop.set()
+    thread.join()
+    for conn in accepted:
+        conn.close()
+    listener.close()
+
+
+def test_clamped_read_timeout_becomes_a_phase_tagged_timeout(stubbed_auth, silent_server):
+    auth, _ = stubbed_auth({})
+    auth.device_key = None
+    auth.session.request = _redirect_to(auth.session.request, silent_server)
+    start = time.monotonic()
+    result = AuthWorkflow(auth).run_email_login('a@b.c', 'pw', deadline=3)
+    elapsed = time.monotonic() - start
+    assert result['status'] == 'timeout' and result['deadline_exceeded'] and result['phase'] == 'preparing_device', result
+    assert 2.5 < elapsed < 4
+
+
+def test_verify_service_requests_share_the_budget(stubbed_auth, silent_server):
+    auth, _ = stubbed_auth({})
+    auth.session.request = _redirect_to(auth.session.request, silent_server)
+    result = AuthWorkflow(auth).confirm_verification('ticket', deadline=2.5)
+    assert result['status'] == 'timeout' and result['phase'] == 'waiting_verify', result
+
+
+def _redirect_to(request, base_url):
+    def redirected(method, url, *args, **kwargs):
+        path = url.split('://', 1)[1].split('/', 1)[1]
+        return request(method, f"{base_url}/{path}", *args, **kwargs)
+    return redirected
@@ -0,0 +1,89 @@
+import os
+import re
+import time
+from contextlib import nullcontext
+
+import pytest
+
+from profiling import PROFILE_ENV, install_profiling
+from services.storage_service import StorageService
+from workflow import AuthWorkflow
+
+
+class StubAuth:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def deadline_scope(self, deadline):
+        return nullcontext(deadline)
+
+    def prepare_device(self):
+        time.sleep(0.05)
+        self.storage.save_device_info('dev', 'key', 'udid', 'unique')
+        time.sleep(0.2)
+        return {'status': 'failed', 'message': 'stub'}
+
+    def get_state_snapshot(self):
+        return {'restored_session': self.storage.restore_session_snapshot()}
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, '1')
+    storage = StorageService(str(tmp_path))
+    workflow = AuthWorkflow(StubAuth(storage))
+    return workflow, storage, install_profiling(workflow, storage)
+
+
+def _reports(report_dir):
+    return sorted(os.listdir(report_dir)) if os.path.isdir(report_dir) else []
+
+
+def _cumtime(text, function):
+    for line in text.splitlines():
+        if line.rstrip().endswith(f"({function})"):
+            return float(line.split()[3])
+    raise AssertionError(f"{function} not in report")
+
+
+def test_disabled_profiling_wraps_nothing(tmp_path, monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    storage = StorageService(str(tmp_path))
+    workflow = AuthWorkflow(StubAuth(storage))
+    assert install_profiling(workflow, storage)['status'] == 'idle'
+    assert 'run_email_login' not in vars(workflow) and 'save_device_info' not in vars(storage)
+
+
+def test_parent_cumtime_survives_nested_storage_call(profiled):
+    workflow, storage, installed = profiled
+    workflow.run_email_login('a@b.c', 'pw')
+    reports = _reports(installed['report_dir'])
+    assert len(reports) == 1 and reports[0].startswith('workflow_run_email_login_')
+    with open(os.path.join(installed['report_dir'], reports[0]), encoding='utf-8') as f:
+        text = f.read()
+    wall_time = float(re.search(r'wall_time: ([0-9.]+)s', text).group(1))
+    assert wall_time >= 0.25
+    assert _cumtime(text, '_run_email_login') >= 0.9 * wall_time
+    assert '== nested storage_save_device_info ==' in text
+    assert '== top 25 allocation sites ==' in text
+
+
+def test_reads_outside_a_phase_write_no_reports(profiled):
+    workflow, storage, installed = profiled
+    for _ in range(4):
+        storage.restore_session_snapshot()
+        storage.load_device_info()
+    assert _reports(installed['report_dir']) == []
+    storage.save_sauth_data({'sdkuid': 'u'})
+    assert [name.split('_2')[0] for name in _reports(installed['report_dir'])] == ['storage_save_sauth_data']
+
+
+def test_report_write_failure_is_surfaced(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, '1')
+    storage = StorageService(str(tmp_path))
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('')
+    workflow = AuthWorkflow(StubAuth(storage))
+    installed = install_profiling(workflow, storage, report_dir=str(blocker / 'profiles'))
+    result = workflow.restore_previous_session()
+    assert result['profile_report_error'] and len(installed['errors']) == 1
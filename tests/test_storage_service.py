@@ -0,0 +1,52 @@
+import io
+import json
+import os
+import zipfile
+
+from services.storage_service import BUNDLE_FORMAT, StorageService
+
+
+SAUTH = {'sdkuid': 'u', 'sessionid': 's', 'deviceid': 'd', 'udid': 'x', 'aim_info': '{"aim":"127.0.0.1"}'}
+COOKIES = {'sid': 'abc'}
+
+
+def test_json_bundle_is_one_compact_document_with_native_sauth(tmp_path):
+    storage = StorageService(str(tmp_path))
+    result = storage.export_bundle(SAUTH, COOKIES, 'a@b.c')
+    assert result['status'] == 'success' and result['path'].endswith('.json')
+    assert os.listdir(tmp_path / 'artifacts') == [os.path.basename(result['path'])]
+    with open(result['path'], 'rb') as f:
+        raw = f.read()
+    assert len(raw) == result['size'] and b'\n' not in raw and b'": ' not in raw
+    bundle = json.loads(raw)
+    assert bundle['format'] == BUNDLE_FORMAT
+    assert bundle['sauth'] == SAUTH and bundle['http_cookies'] == COOKIES
+    assert 'sauth_json' not in raw.decode('utf-8') and 'nemc_cookie' not in bundle
+    assert bundle['metadata']['nemc_ready'] is True and bundle['metadata']['missing_fields'] == []
+
+
+def test_zip_bundle_holds_one_member_per_part(tmp_path):
+    storage = StorageService(str(tmp_path))
+    result = storage.export_bundle({'sdkuid': 'u'}, COOKIES, 'a@b.c', fmt='zip')
+    assert result['status'] == 'success' and result['path'].endswith('.zip')
+    with zipfile.ZipFile(result['path']) as archive:
+        assert sorted(archive.namelist()) == ['http_cookies.json', 'metadata.json', 'sauth.json']
+        assert json.loads(archive.read('sauth.json')) == {'sdkuid': 'u'}
+        metadata = json.loads(archive.read('metadata.json'))
+    assert metadata['nemc_ready'] is False and metadata['missing_fields'] == ['sessionid', 'deviceid', 'udid']
+
+
+def test_bundle_streams_without_touching_disk(tmp_path):
+    storage = StorageService(str(tmp_path))
+    text_stream = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+    result = storage.export_bundle(SAUTH, COOKIES, 'a@b.c', stream=text_stream)
+    assert result['status'] == 'success' and 'path' not in result
+    assert json.loads(text_stream.buffer.getvalue())['sauth'] == SAUTH
+    binary_stream = io.BytesIO()
+    assert storage.export_bundle(SAUTH, COOKIES, 'a@b.c', fmt='zip', stream=binary_stream)['status'] == 'success'
+    assert zipfile.is_zipfile(io.BytesIO(binary_stream.getvalue()))
+    assert os.listdir(tmp_path / 'artifacts') == []
+
+
+def test_unknown_bundle_format_is_rejected(tmp_path):
+    assert StorageService(str(tmp_path)).export_bundle(SAUTH, COOKIES, 'a@b.c', fmt='tar')['status'] == 'failed'
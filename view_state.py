@@ -141,6 +141,12 @@ def summarize_result(data):
     elif verify_state == 'verify_resolved':
         lines.append('1351状态: 验证已完成')
 
+    if data.get('deadline_exceeded'):
+        lines.append(f"时间预算: {data.get('budget')}s 已耗尽，剩余 {data.get('remaining_budget')}s")
+
+    if data.get('profile_report_error'):
+        lines.append(f"性能报告写入失败: {data['profile_report_error']}")
+
     if data.get('conversion_complete'):
         lines.append('转换结果: Cookie / SAuth 已可复用')
 
@@ -3,6 +3,8 @@
 
 import threading
 
+from services.deadline import Deadline, DeadlineExceeded
+
 
 class AuthWorkflow:
     def __init__(self, auth_service):
@@ -11,13 +13,24 @@ class AuthWorkflow:
         self.auto_restore_enabled = True
         self._poll_timer = None
 
+    def _with_deadline(self, deadline, func, *args):
+        deadline = Deadline.coerce(deadline)
+        try:
+            with self.auth.deadline_scope(deadline):
+                return func(*args)
+        except DeadlineExceeded as e:
+            return e.to_result()
+
     def restore_previous_session(self):
         snapshot = self.auth.get_state_snapshot().get('restored_session', {})
         if snapshot.get('has_sauth'):
             return {'status': 'success', 'message': '已恢复旧会话', 'restored': snapshot, 'phase': 'session_restored'}
         return {'status': 'idle', 'message': '未发现可恢复会话', 'restored': snapshot, 'phase': 'idle'}
 
-    def run_email_login(self, email, password):
+    def run_email_login(self, email, password, deadline=None):
+        return self._with_deadline(deadline, self._run_email_login, email, password)
+
+    def _run_email_login(self, email, password):
         prepare = self.auth.prepare_device()
         if prepare['status'] != 'success':
             prepare['phase'] = 'preparing_device'
@@ -35,12 +48,17 @@ class AuthWorkflow:
             result['phase'] = 'logging_in'
         return result
 
-    def request_phone_sms(self, phone_number):
-        result = self.auth.request_phone_login_sms(phone_number)
+    def request_phone_sms(self, phone_number, deadline=None):
+        result = self._with_deadline(deadline, self.auth.request_phone_login_sms, phone_number)
+        if result['status'] == 'timeout':
+            return result
         result['phase'] = 'waiting_sms_code' if result['status'] == 'success' else 'requesting_sms'
         return result
 
-    def complete_phone_login(self, phone_number, verify_code):
+    def complete_phone_login(self, phone_number, verify_code, deadline=None):
+        return self._with_deadline(deadline, self._complete_phone_login, phone_number, verify_code)
+
+    def _complete_phone_login(self, phone_number, verify_code):
         prepare = self.auth.prepare_device()
         if prepare['status'] != 'success':
             prepare['phase'] = 'preparing_device'
@@ -55,8 +73,10 @@ class AuthWorkflow:
             result['phase'] = 'logging_in'
         return result
 
-    def confirm_verification(self, ticket, label=None):
-        result = self.auth.verify_with_ticket(ticket, label)
+    def confirm_verification(self, ticket, label=None, deadline=None):
+        result = self._with_deadline(deadline, self.auth.verify_with_ticket, ticket, label)
+        if result['status'] == 'timeout':
+            return result
         if result['status'] == 'success':
             result['phase'] = 'artifacts_ready'
             result['conversion_complete'] = True
@@ -66,8 +86,10 @@ class AuthWorkflow:
             result['verify_state'] = result.get('verify_state', 'verify_pending')
         return result
 
-    def fetch_mailbox(self):
-        result = self.auth.get_mailbox_list()
+    def fetch_mailbox(self, deadline=None):
+        result = self._with_deadline(deadline, self.auth.get_mailbox_list)
+        if result['status'] == 'timeout':
+            return result
         result['phase'] = 'fetching_mailbox'
         result['result_kind'] = 'mailbox'
         return result